@@ -0,0 +1,28 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, cdivision=True
+from libc.math cimport isnan
+
+
+def compute_ofi_c(const float[:, :] bid_size, const float[:, :] ask_size, const float[:, :] bid_price, const float[:, :] ask_price, float[::1, :] out):
+    """
+    Compute the cumulative multi-level OFI into `out` without holding the GIL.
+    Mirrors the Numba kernel in compute_ofi_metrics for builds where Numba is unavailable.
+    """
+    cdef Py_ssize_t n = bid_size.shape[0]
+    cdef Py_ssize_t levels = bid_size.shape[1]
+    cdef Py_ssize_t i, j
+    cdef double running_ofi, bid_flow, ask_flow
+
+    with nogil:
+        for j in range(levels):
+            running_ofi = 0.0
+            if n > 0:
+                out[0, j] = 0.0
+            for i in range(1, n):
+                bid_flow = bid_size[i, j] - bid_size[i - 1, j]
+                if isnan(bid_flow) or bid_price[i, j] < bid_price[i - 1, j]:
+                    bid_flow = 0.0
+                ask_flow = -(ask_size[i, j] - ask_size[i - 1, j])
+                if isnan(ask_flow) or ask_price[i, j] > ask_price[i - 1, j]:
+                    ask_flow = 0.0
+                running_ofi += bid_flow - ask_flow
+                out[i, j] = <float>running_ofi
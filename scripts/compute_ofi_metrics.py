@@ -1,11 +1,73 @@
 import pandas as pd
 import numpy as np
-from sklearn.decomposition import PCA
-from typing import Dict, Tuple
+from functools import lru_cache
+from typing import Tuple
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+try:
+    # optional Cython build of the same kernel, see setup.py
+    from _ofi_kernel import compute_ofi_c
+    CYTHON_KERNEL_AVAILABLE = True
+except ImportError:
+    CYTHON_KERNEL_AVAILABLE = False
+
+@lru_cache(maxsize=16)
+def _level_columns(prefix: str, levels: int) -> Tuple[str, ...]:
+    # order book column names for levels 1..levels, e.g. bid_sz_01 ... bid_sz_05
+    return tuple(f'{prefix}_{level:02d}' for level in range(1, levels + 1))
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, cache=True)
+    def _ofi_kernel(bid_size, ask_size, bid_price, ask_price, out):
+        """
+        Stream through the order book once per level, masking the order flows and
+        accumulating the cumulative OFI in a register instead of via temporaries.
+        """
+        n, levels = bid_size.shape
+        for j in prange(levels):
+            running_ofi = 0.0
+            out[0, j] = running_ofi
+            for i in range(1, n):
+                bid_flow = bid_size[i, j] - bid_size[i - 1, j]
+                if np.isnan(bid_flow) or bid_price[i, j] - bid_price[i - 1, j] < 0:
+                    bid_flow = 0.0
+                ask_flow = -(ask_size[i, j] - ask_size[i - 1, j])
+                if np.isnan(ask_flow) or ask_price[i, j] - ask_price[i - 1, j] > 0:
+                    ask_flow = 0.0
+                running_ofi += bid_flow - ask_flow
+                out[i, j] = running_ofi
+
+def _multi_level_ofi_numpy(bid_size: np.ndarray, ask_size: np.ndarray, bid_price: np.ndarray, ask_price: np.ndarray) -> np.ndarray:
+    # the first update has zero flow, as with diff().fillna(0)
+    multi_level_ofi = np.empty(bid_size.shape, dtype=np.float32, order='F')
+    multi_level_ofi[:1] = 0.0
+    ask_size_diff = np.empty_like(multi_level_ofi)
+    ask_size_diff[:1] = 0.0
+
+    # OF_bid, masked in place when the bid price drops
+    of_bid = multi_level_ofi[1:]
+    np.subtract(bid_size[1:], bid_size[:-1], out=of_bid)
+    np.nan_to_num(of_bid, copy=False, nan=0.0)
+    of_bid[bid_price[1:] < bid_price[:-1]] = 0.0
+
+    # OF_ask is the negated ask size change, masked when the ask price rises, so OF_bid - OF_ask adds it back
+    np.subtract(ask_size[1:], ask_size[:-1], out=ask_size_diff[1:])
+    np.nan_to_num(ask_size_diff, copy=False, nan=0.0)
+    ask_size_diff[1:][ask_price[1:] > ask_price[:-1]] = 0.0
+    multi_level_ofi += ask_size_diff
+
+    np.cumsum(multi_level_ofi, axis=0, dtype=np.float64, out=multi_level_ofi)
+    return multi_level_ofi
 
-def compute_order_flow(book_updates: pd.DataFrame, levels: int) -> Tuple[Dict[int, pd.Series], Dict[int, pd.Series]]:
+def compute_multi_level_ofi(book_updates: pd.DataFrame, levels: int) -> np.ndarray:
     """
-    Compute bid and ask order flows at each level of the order book.
+    Compute the cumulative multi-level Order Flow Imbalance (OFI) in a single pass over the order book.
+    Uses the Numba kernel when Numba is installed, then the compiled Cython kernel, and falls back to vectorized NumPy otherwise.
     
     Parameters
     ----------
@@ -16,63 +78,28 @@ def compute_order_flow(book_updates: pd.DataFrame, levels: int) -> Tuple[Dict[in
 
     Returns
     ----------
-        Tuple[Dict[int, pd.Series], Dict[int, pd.Series]]
-            Dictionaries containing bid and ask order flows for each level.
-    """
-    of_bid = {}
-    of_ask = {}
-    for level in range(1, levels + 1):
-        of_bid[level] = book_updates[f'bid_sz_{level:02d}'].diff().fillna(0)
-        of_ask[level] = -book_updates[f'ask_sz_{level:02d}'].diff().fillna(0)
-
-        of_bid[level][book_updates[f'bid_px_{level:02d}'].diff() < 0] = 0
-        of_ask[level][book_updates[f'ask_px_{level:02d}'].diff() > 0] = 0
-    return of_bid, of_ask
-
-def compute_best_level_ofi(of_bid, of_ask):
-    best_ofi = of_bid[1] - of_ask[1]
-    return best_ofi.cumsum()
-
-def compute_deeper_level_ofi(of_bid: Dict[int, pd.Series], of_ask: Dict[int, pd.Series], levels: int) -> Dict[int, pd.Series]:
-    """
-    Compute the deeper-level Order Flow Imbalance (OFI) for each level.
-    
-    Parameters
-    ----------
-        of_bid: (Dict[int, pd.Series])
-            Bid order flows for each level.
-        of_ask: (Dict[int, pd.Series])
-            Ask order flows for each level.
-        levels: int
-            Number of levels in the order book to consider.
-
-    Returns
-    ----------
-        Dict[int, pd.Series]
-            Cumulative deeper-level OFI for each level over time.
-    """
-    deeper_ofi = {}
-    for level in range(1, levels + 1):
-        deeper_ofi[level] = (of_bid[level] - of_ask[level]).cumsum()
-    return deeper_ofi
-
-def compute_multi_level_ofi(deeper_ofi: Dict[int, pd.Series], levels: int) -> np.ndarray:
-    """
-    Compute the multi-level OFI vector by stacking deeper-level OFIs for all levels.
-    
-    Parameters
-    ----------
-        deeper_ofi: Dict[int, pd.Series]
-            Cumulative deeper-level OFI for each level.
-        levels: int
-            Number of levels in the order book to consider.
-
-    Returns
-    ----------
-        np.ndarray: Multi-level OFI vector (time series) with shape (n_samples, levels).
+        np.ndarray
+            Cumulative OFI for each level over time with shape (n_samples, levels).
     """
-    multi_level_ofi = np.vstack([deeper_ofi[level] for level in range(1, levels + 1)]).T
-    return multi_level_ofi
+    bid_size = book_updates[list(_level_columns('bid_sz', levels))].to_numpy(dtype=np.float32)
+    ask_size = book_updates[list(_level_columns('ask_sz', levels))].to_numpy(dtype=np.float32)
+    bid_price = book_updates[list(_level_columns('bid_px', levels))].to_numpy(dtype=np.float32)
+    ask_price = book_updates[list(_level_columns('ask_px', levels))].to_numpy(dtype=np.float32)
+
+    # every path returns a Fortran-ordered buffer, one contiguous column per level: the kernels fill
+    # a level at a time, so each prange thread owns its column instead of sharing cache lines across a row
+    if NUMBA_AVAILABLE:
+        multi_level_ofi = np.empty(bid_size.shape, dtype=np.float32, order='F')
+        if len(multi_level_ofi):
+            _ofi_kernel(bid_size, ask_size, bid_price, ask_price, multi_level_ofi)
+        return multi_level_ofi
+
+    if CYTHON_KERNEL_AVAILABLE:
+        multi_level_ofi = np.empty(bid_size.shape, dtype=np.float32, order='F')
+        compute_ofi_c(bid_size, ask_size, bid_price, ask_price, multi_level_ofi)
+        return multi_level_ofi
+
+    return _multi_level_ofi_numpy(bid_size, ask_size, bid_price, ask_price)
 
 def compute_average_depth(book_updates: pd.DataFrame, levels: int) -> np.ndarray:
     """
@@ -90,11 +117,10 @@ def compute_average_depth(book_updates: pd.DataFrame, levels: int) -> np.ndarray
         np.ndarray
             Average depth for scaling OFI at each level.
     """
-    avg_depths = []
-    for level in range(1, levels + 1):
-        avg_depth = book_updates[[f'bid_sz_{level:02d}', f'ask_sz_{level:02d}']].mean(axis=1).mean()
-        avg_depths.append(avg_depth)
-    return np.array(avg_depths)
+    bid_depth = book_updates[list(_level_columns('bid_sz', levels))].mean().to_numpy(dtype=np.float32)
+    ask_depth = book_updates[list(_level_columns('ask_sz', levels))].mean().to_numpy(dtype=np.float32)
+    avg_depths = 0.5 * (bid_depth + ask_depth)
+    return avg_depths
 
 
 def scale_ofi(multi_level_ofi: np.ndarray, avg_depths: np.ndarray) -> np.ndarray:
@@ -130,10 +156,8 @@ def calculate_ofi(book_updates: pd.DataFrame, levels: int = 5) -> Tuple[pd.Serie
         Tuple[pd.Series, np.ndarray]
             Best-level OFI (cumulative) and scaled multi-level OFI vector.
     """
-    of_bid, of_ask = compute_order_flow(book_updates, levels)
-    best_ofi = compute_best_level_ofi(of_bid, of_ask)
-    deeper_ofi = compute_deeper_level_ofi(of_bid, of_ask, levels)
-    multi_level_ofi = compute_multi_level_ofi(deeper_ofi, levels)
+    multi_level_ofi = compute_multi_level_ofi(book_updates, levels)
+    best_ofi = pd.Series(multi_level_ofi[:, 0], index=book_updates.index)
     avg_depths = compute_average_depth(book_updates, levels)
     scaled_ofi = scale_ofi(multi_level_ofi, avg_depths)
     return best_ofi, scaled_ofi
@@ -151,11 +175,23 @@ def integrate_ofi_with_pca(multi_level_ofi: np.ndarray) -> np.ndarray:
     ----------
         np.ndarray
             Integrated OFI time series as a single metric.
-    """
-    pca = PCA(n_components=1)
-    pca.fit(multi_level_ofi)
 
-    w1 = pca.components_[0]
+    Raises
+    ----------
+        ValueError
+            If there are fewer than two samples, since the covariance is undefined.
+    """
+    n_samples = multi_level_ofi.shape[0]
+    if n_samples < 2:
+        raise ValueError(f"At least 2 order book updates are needed to integrate OFI with PCA, got {n_samples}.")
+
+    # the first principal component is the top eigenvector of the (n_levels, n_levels) covariance,
+    # which is far cheaper than an SVD of the full (n_samples, n_levels) matrix
+    covariance = np.cov(multi_level_ofi, rowvar=False)
+    _, eigenvectors = np.linalg.eigh(covariance)
+    w1 = eigenvectors[:, -1]
+    # same sign convention as sklearn's PCA: the largest loading is positive
+    w1 = w1 * np.sign(w1[np.argmax(np.abs(w1))])
     w1_normalized = w1 / np.sum(np.abs(w1))
     
     integrated_ofi = np.dot(multi_level_ofi, w1_normalized)
@@ -163,10 +199,10 @@ def integrate_ofi_with_pca(multi_level_ofi: np.ndarray) -> np.ndarray:
 
 if __name__ == "__main__":
     path = "/Users/ibringfaith/Documents/GitHub/cross-impact-analysis-of-order-flow-imbalance/data"
-    stock_files = [f"{path}/AAPL.csv", f"{path}/AMGN.csv", f"{path}/TSLA.csv", f"{path}/JPM.csv", f"{path}/XOM.csv"]
+    stock_files = [f"{path}/AAPL.parquet", f"{path}/AMGN.parquet", f"{path}/TSLA.parquet", f"{path}/JPM.parquet", f"{path}/XOM.parquet"]
     for stock_file in stock_files:
         try:
-            stock_data = pd.read_csv(stock_file)
+            stock_data = pd.read_parquet(stock_file)
             
             # derive multi-level OFI metrics (up to 5 levels)
             levels = 5
@@ -182,4 +218,6 @@ if __name__ == "__main__":
             print("\nIntegrated Multi-Level OFI (using PCA):")
             print(integrated_ofi[:10])
         except FileNotFoundError:
-            print(f"Error: '{stock_file}' file not found. Please ensure the file exists.")
\ No newline at end of file
+            print(f"Error: '{stock_file}' file not found. Please ensure the file exists.")
+        except ValueError as e:
+            print(f"Error: could not compute OFI metrics for '{stock_file}': {e}")
\ No newline at end of file
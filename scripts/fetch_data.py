@@ -2,6 +2,9 @@ import databento as db
 import pandas as pd
 import numpy as np
 import os
+import pyarrow as pa
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 from dotenv import load_dotenv
 
 def initialize_databento_client(api_key: str) -> db.Historical:
@@ -10,9 +13,84 @@ def initialize_databento_client(api_key: str) -> db.Historical:
     """
     return db.Historical(api_key)
 
-def fetch_mbp10_data(client: db.Historical, stock: str, start_date: str = None, end_date: str = None, dataset: str = 'XNAS.ITCH') -> pd.DataFrame:
+def get_cache_path(stock: str, start_date: str = None, end_date: str = None, dataset: str = 'XNAS.ITCH', cache_dir: str = 'cache') -> Optional[str]:
+    """
+    Builds the local Parquet cache path for a stock's MBP-10 download.
+    Open-ended ranges are not cached, since their contents change as new data arrives.
+    
+    Parameters
+    ----------
+    stock: str
+        The stock symbol.
+    start_date: str, optional
+        The start date of the download in YYYY-MM-DDT00:00 format.
+    end_date: str, optional
+        The end date of the download in YYYY-MM-DDT00:00 format.
+    dataset: str
+        Dataset of the download.
+    cache_dir: str
+        Root directory of the local cache.
+    
+    Returns
+    ----------
+    str | None
+        The cache file path, or None if the date range is open-ended.
+    """
+    if start_date is None or end_date is None:
+        return None
+    date_range = f"{start_date}_{end_date}".replace(':', '')
+    return os.path.join(cache_dir, dataset, stock, f"{date_range}.parquet")
+
+def load_cached_data(cache_path: str) -> Optional[pd.DataFrame]:
+    """
+    Loads a cached MBP-10 download, discarding the cache file if it is corrupt.
+    Other errors, such as running out of memory, are raised so a valid cache file is never deleted.
+    
+    Parameters
+    ----------
+    cache_path: str
+        The cache file path.
+    
+    Returns
+    ----------
+    pd.DataFrame | None
+        The cached data, or None if there is no usable cache file.
+    """
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        return pd.read_parquet(cache_path)
+    except (pa.ArrowInvalid, OSError) as e:
+        print(f"Discarding corrupt cache file {cache_path}: {e}")
+        os.remove(cache_path)
+        return None
+
+def write_cached_data(data: pd.DataFrame, cache_path: str):
+    """
+    Writes an MBP-10 download to the cache atomically, so an interrupted write never leaves a partial cache file.
+    Failures are reported but not raised, since the downloaded data is still usable.
+    
+    Parameters
+    ----------
+    data: pd.DataFrame
+        The downloaded MBP-10 data.
+    cache_path: str
+        The cache file path.
+    """
+    tmp_path = cache_path + '.tmp'
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        data.to_parquet(tmp_path, engine='pyarrow', compression='zstd')
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        print(f"Error caching data to {cache_path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def fetch_mbp10_data(client: db.Historical, stock: str, start_date: str = None, end_date: str = None, dataset: str = 'XNAS.ITCH', cache_dir: str = 'cache') -> pd.DataFrame:
     """
     Fetches MBP-10 data for the given stock using the MBP-10 data schema provided by Databento.
+    Downloads over a fixed date range are cached locally as Parquet, so reruns over the same range skip the network.
     
     Parameters
     ----------
@@ -26,12 +104,21 @@ def fetch_mbp10_data(client: db.Historical, stock: str, start_date: str = None,
         The end date for fetching data in YYYY-MM-DDT00:00 format.
     dataset: str
         Dataset to fetch.
+    cache_dir: str
+        Root directory of the local cache.
     
     Returns
     ----------
     pd.DataFrame
         The MBP-10 data for the specified stock.
     """
+    cache_path = get_cache_path(stock, start_date, end_date, dataset, cache_dir)
+    if cache_path is not None:
+        cached = load_cached_data(cache_path)
+        if cached is not None:
+            print(f"Loading cached data for {stock} from {cache_path}")
+            return cached
+
     try:
         data = client.timeseries.get_range(
             dataset=dataset,
@@ -41,6 +128,8 @@ def fetch_mbp10_data(client: db.Historical, stock: str, start_date: str = None,
             end=end_date
             )
         df = data.to_df()
+        if cache_path is not None and not df.empty:
+            write_cached_data(df, cache_path)
         return df
     except db.common.error.BentoClientError as e:
         print(f"Error fetching data: {e}")
@@ -49,7 +138,7 @@ def fetch_mbp10_data(client: db.Historical, stock: str, start_date: str = None,
 
 def save_data(data: pd.DataFrame, filename: str):
     """
-    Saves the data to a CSV file.
+    Saves the data to a zstd-compressed Parquet file.
     
     Parameters
     ----------
@@ -58,12 +147,41 @@ def save_data(data: pd.DataFrame, filename: str):
     filename: str
         The file path to save the data.
     """
-    data.to_csv(filename, index=False)
+    data.to_parquet(filename, engine='pyarrow', compression='zstd', index=False)
     print(f"Data saved to {filename}")
 
-def fetch_and_save_data(client: db.Historical, stocks: list[str], start_date: str, end_date: str, dataset: str = 'XNAS.ITCH'):
+def fetch_and_save_stock_data(client: db.Historical, stock: str, start_date: str, end_date: str, dataset: str = 'XNAS.ITCH'):
+    """
+    Fetches and saves data for a single stock.
+    
+    Parameters
+    ----------
+    client: Historical
+        Databento client instance.
+    stock: str
+        The stock symbol.
+    start_date: str
+        The start date for fetching data in YYYY-MM-DD format.
+    end_date: str
+        The end date for fetching data in YYYY-MM-DD format.
+    dataset: str
+        Dataset to fetch.
+    """
+    try:
+        print(f"Fetching data for {stock} from {start_date} to {end_date}...")
+        df = fetch_mbp10_data(client, stock, start_date, end_date, dataset)
+        if df.empty:
+            print(f"No data found for {stock} in the specified range.")
+        else:
+            filename = f'data/{stock}.parquet'
+            save_data(df, filename)
+            print(f"Data for {stock} saved to {filename}")
+    except Exception as e:
+        print(f"Error while processing {stock}: {e}")
+
+def fetch_and_save_data(client: db.Historical, stocks: list[str], start_date: str, end_date: str, dataset: str = 'XNAS.ITCH', max_workers: int = 8):
     """
-    Fetches and saves data for the given stocks.
+    Fetches and saves data for the given stocks, overlapping the network-bound requests in a thread pool.
     
     Parameters
     ----------
@@ -75,21 +193,15 @@ def fetch_and_save_data(client: db.Historical, stocks: list[str], start_date: st
         The start date for fetching data in YYYY-MM-DD format.
     end_date: str
         The end date for fetching data in YYYY-MM-DD format.
+    dataset: str
+        Dataset to fetch.
+    max_workers: int
+        Maximum number of stocks fetched concurrently.
     """
     os.makedirs('data', exist_ok=True)
     
-    for stock in stocks:
-        try:
-            print(f"Fetching data for {stock} from {start_date} to {end_date}...")
-            df = fetch_mbp10_data(client, stock, start_date, end_date)
-            if df.empty:
-                print(f"No data found for {stock} in the specified range.")
-            else:
-                filename = f'data/{stock}.csv'
-                save_data(df, filename)
-                print(f"Data for {stock} saved to {filename}")
-        except Exception as e:
-            print(f"Error while processing {stock}: {e}")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(lambda stock: fetch_and_save_stock_data(client, stock, start_date, end_date, dataset), stocks))
 
 if __name__ == "__main__":
     load_dotenv()
@@ -0,0 +1,9 @@
+from setuptools import setup, Extension
+from Cython.Build import cythonize
+
+# build the optional Cython OFI kernel next to the scripts with:
+#   python setup.py build_ext --inplace
+setup(
+    name="ofi-kernel",
+    ext_modules=cythonize([Extension("_ofi_kernel", ["_ofi_kernel.pyx"])]),
+)